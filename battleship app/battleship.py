@@ -3,6 +3,8 @@ import re
 import sys
 import unicodedata
 import string
+import time
+from collections import Counter
 from typing import Dict, List, Optional, Set, Tuple
 
 
@@ -33,6 +35,13 @@ SHIPS = [
 
 Coord = Tuple[int, int]
 
+# Endgame limits: enumerate layouts once the product of per-ship placement counts is small,
+# search for the exact best shot once few distinct layouts remain, and cap search time per move.
+ENDGAME_MAX_PLACEMENTS = 20000
+ENDGAME_MAX_CONFIGS = 400
+ENDGAME_EXACT_CONFIGS = 12
+ENDGAME_TIME_LIMIT = 0.1
+
 SHOW_AI_SHIPS = False
 
 
@@ -50,6 +59,30 @@ def coord_to_label(coord: Coord) -> str:
     return f"{ROWS[r]}{c + 1}"
 
 
+def coord_to_bit(coord: Coord) -> int:
+    r, c = coord
+    return 1 << (r * BOARD_SIZE + c)
+
+
+def bit_to_coord(bit: int) -> Coord:
+    return divmod(bit.bit_length() - 1, BOARD_SIZE)
+
+
+def placement_masks(size: int) -> List[int]:
+    masks: List[int] = []
+    for r in range(BOARD_SIZE):
+        for c in range(BOARD_SIZE):
+            if c + size <= BOARD_SIZE:
+                masks.append(sum(coord_to_bit((r, c + i)) for i in range(size)))
+            if size > 1 and r + size <= BOARD_SIZE:
+                masks.append(sum(coord_to_bit((r + i, c)) for i in range(size)))
+    return masks
+
+
+# Every legal placement of each ship size on an empty board, as cell bitmasks
+PLACEMENTS: Dict[int, List[int]] = {size: placement_masks(size) for size in sorted({s for _, s in SHIPS})}
+
+
 def parse_coord(token: str) -> Optional[Coord]:
     token = token.strip().upper()
     m = re.fullmatch(r"([A-J])\s*(10|[1-9])", token)
@@ -195,16 +228,34 @@ def render_board(board: Board, show_ships: bool, color: str) -> str:
     return "\n".join(lines)
 
 
+class SearchTimeout(Exception):
+    pass
+
+
+# Endgame state: (configuration, weight) pairs, where a configuration holds the
+# not-yet-hit cells of each remaining ship as bitmasks, in SHIPS order.
+EndgameState = Tuple[Tuple[Tuple[int, ...], int], ...]
+
+
 class AIPlayer:
     def __init__(self) -> None:
         self.available: Set[Coord] = {(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)}
         self.target_queue: List[Coord] = []
         self.hit_chain: List[Coord] = []
+        self.hit_mask = 0
+        self.miss_mask = 0
+        # (ship name, sinking shot, hit mask at the time it sank)
+        self.sunk_ships: List[Tuple[str, Coord, int]] = []
+        self.endgame_memo: Dict[EndgameState, Tuple[float, int]] = {}
 
     def reset(self) -> None:
         self.available = {(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)}
         self.target_queue = []
         self.hit_chain = []
+        self.hit_mask = 0
+        self.miss_mask = 0
+        self.sunk_ships = []
+        self.endgame_memo = {}
 
     def place_ships_randomly(self, board: Board) -> None:
         for name, size in SHIPS:
@@ -220,6 +271,11 @@ class AIPlayer:
                 raise RuntimeError("AI failed to place ships after many tries")
 
     def next_shot(self) -> Coord:
+        deadline = time.perf_counter() + ENDGAME_TIME_LIMIT
+        coord = self.endgame_shot(deadline)
+        if coord is not None and coord in self.available:
+            self.available.discard(coord)
+            return coord
         while self.target_queue and self.target_queue[-1] not in self.available:
             self.target_queue.pop()
         if self.target_queue:
@@ -235,7 +291,12 @@ class AIPlayer:
         return coord
 
     def on_result(self, coord: Coord, result: str, sunk: Optional[str]) -> None:
+        if result == 'miss':
+            self.miss_mask |= coord_to_bit(coord)
         if result == 'hit' or result == 'sunk':
+            self.hit_mask |= coord_to_bit(coord)
+            if result == 'sunk' and sunk is not None:
+                self.sunk_ships.append((sunk, coord, self.hit_mask))
             self.hit_chain.append(coord)
             if result == 'sunk':
                 self.target_queue.clear()
@@ -264,6 +325,126 @@ class AIPlayer:
             if 0 <= p[0] < BOARD_SIZE and 0 <= p[1] < BOARD_SIZE and p in self.available:
                 self.target_queue.append(p)
 
+    def endgame_state(self, deadline: float) -> Optional[EndgameState]:
+        """Enumerate every fleet layout consistent with the shots so far, or None if there are too many.
+
+        Raises SearchTimeout if the enumeration runs past the deadline.
+        """
+        sizes = dict(SHIPS)
+        sunk_names = {name for name, _, _ in self.sunk_ships}
+        remaining = [name for name, _ in SHIPS if name not in sunk_names]
+        if not remaining:
+            return None
+        options: List[Tuple[str, List[int]]] = []
+        # A sunk ship lies entirely on cells hit by the time it sank and includes the sinking shot
+        for name, coord, hits_then in self.sunk_ships:
+            bit = coord_to_bit(coord)
+            options.append((name, [m for m in PLACEMENTS[sizes[name]] if m & bit and not m & ~hits_then]))
+        # A ship still afloat avoids misses and cannot be fully hit
+        for name in remaining:
+            options.append((name, [
+                m for m in PLACEMENTS[sizes[name]]
+                if not m & self.miss_mask and m & ~self.hit_mask
+            ]))
+        space = 1
+        for _, masks in options:
+            space *= len(masks)
+        if space == 0 or space > ENDGAME_MAX_PLACEMENTS:
+            return None
+
+        options.sort(key=lambda o: len(o[1]))
+        order = [remaining.index(name) if name in remaining else -1 for name, _ in options]
+        configs: Counter = Counter()
+        chosen = [0] * len(remaining)
+
+        def place(i: int, used: int) -> None:
+            if i == len(options):
+                # Every hit must be explained by some ship
+                if not self.hit_mask & ~used:
+                    configs[tuple(m & ~self.hit_mask for m in chosen)] += 1
+                return
+            if time.perf_counter() > deadline:
+                raise SearchTimeout()
+            for m in options[i][1]:
+                if m & used:
+                    continue
+                if order[i] >= 0:
+                    chosen[order[i]] = m
+                place(i + 1, used | m)
+
+        place(0, 0)
+        if not configs or len(configs) > ENDGAME_MAX_CONFIGS:
+            return None
+        return tuple(sorted(configs.items()))
+
+    def endgame_shot(self, deadline: float) -> Optional[Coord]:
+        try:
+            state = self.endgame_state(deadline)
+        except SearchTimeout:
+            # Enumeration did not finish in time; fall back to parity/target-queue shots
+            return None
+        if state is None:
+            return None
+        if len(state) <= ENDGAME_EXACT_CONFIGS:
+            try:
+                return bit_to_coord(self.solve_endgame(state, deadline)[1])
+            except SearchTimeout:
+                pass
+        # Too many layouts (or out of time): take the cell most likely to be a hit
+        return bit_to_coord(self.cell_weights(state).most_common(1)[0][0])
+
+    @staticmethod
+    def cell_weights(state: EndgameState) -> Counter:
+        weights: Counter = Counter()
+        for config, w in state:
+            cells = 0
+            for m in config:
+                cells |= m
+            while cells:
+                bit = cells & -cells
+                weights[bit] += w
+                cells ^= bit
+        return weights
+
+    def solve_endgame(self, state: EndgameState, deadline: float) -> Tuple[float, int]:
+        """Return (expected remaining shots, best cell bit) for the given endgame state."""
+        if state in self.endgame_memo:
+            return self.endgame_memo[state]
+        weights = self.cell_weights(state)
+        if not weights:
+            return (0.0, 0)
+        if time.perf_counter() > deadline:
+            raise SearchTimeout()
+        total = sum(w for _, w in state)
+        # Every remaining ship cell needs one more shot, so this is a lower bound on any strategy
+        floor = sum(sum(bin(m).count("1") for m in config) * w for config, w in state) / total
+        best = (float("inf"), 0)
+        for bit, _ in weights.most_common():
+            if time.perf_counter() > deadline:
+                raise SearchTimeout()
+            outcomes: Dict[Tuple[str, int], Counter] = {}
+            for config, w in state:
+                outcome = ("miss", -1)
+                after = config
+                for i, m in enumerate(config):
+                    if m & bit:
+                        after = config[:i] + (m & ~bit,) + config[i + 1:]
+                        outcome = ("sunk", i) if not m & ~bit else ("hit", -1)
+                        break
+                outcomes.setdefault(outcome, Counter())[after] += w
+            expected = 1.0
+            for group in outcomes.values():
+                sub = tuple(sorted(group.items()))
+                expected += sum(group.values()) / total * self.solve_endgame(sub, deadline)[0]
+                if expected >= best[0]:
+                    break
+            if expected < best[0]:
+                best = (expected, bit)
+                if expected <= floor:
+                    break
+        self.endgame_memo[state] = best
+        return best
+
 
 def prompt(text: str) -> str:
     try:
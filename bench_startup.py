@@ -0,0 +1,60 @@
+"""Measure cold-start cost: time from spawning a fresh interpreter to its first response.
+
+The headline number is measured by the parent and covers interpreter startup, imports
+and the first request. The child also reports where that time went.
+
+Finding: importing Flask (with Werkzeug, Jinja2 and Click) is most of the cold start,
+roughly 170-200 ms of about 220-250 ms here. The rest of `import wsgi` (the game module,
+web/server.py and their stdlib imports) is about 25 ms and the first request about 10 ms.
+Preloading, a warm-up request at import and precomputed lookup tables were tried and did
+not measurably change spawn-to-first-response, so they were not kept.
+
+Usage: python bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import time
+start = time.perf_counter()
+import flask
+flask_imported = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+client = wsgi.app.test_client()
+client.post("/api/new-game", json={})
+client.get("/api/state?format=compact")
+first = time.perf_counter()
+print(flask_imported - start, imported - flask_imported, first - imported, flush=True)
+"""
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_once() -> list:
+    spawned = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", CHILD], cwd=REPO_DIR, stdout=subprocess.PIPE, text=True
+    )
+    line = proc.stdout.readline()
+    total = time.perf_counter() - spawned
+    proc.stdout.close()
+    if proc.wait() != 0 or not line:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    return [total] + [float(x) for x in line.split()]
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    samples = [run_once() for _ in range(runs)]
+    names = ("spawn to first response", "  import flask", "  import wsgi (rest)", "  first response")
+    for i, name in enumerate(names):
+        values = [s[i] * 1000 for s in samples]
+        print(f"{name:<24}: median {statistics.median(values):7.2f} ms  min {min(values):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
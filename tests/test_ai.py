@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+
+import pytest
+
+GAME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "battleship app")
+if GAME_DIR not in sys.path:
+    sys.path.append(GAME_DIR)
+
+import battleship as game  # type: ignore  # noqa: E402
+
+ALL_CELLS = {(r, c) for r in range(game.BOARD_SIZE) for c in range(game.BOARD_SIZE)}
+
+
+def endgame_ai(sunk, hits, open_cells):
+    # Sink the given ships in order, record extra hits, and mark every other cell a miss
+    ai = game.AIPlayer()
+    shot = set()
+    for name, cells in sunk:
+        for i, coord in enumerate(cells):
+            last = i == len(cells) - 1
+            ai.on_result(coord, "sunk" if last else "hit", name if last else None)
+            shot.add(coord)
+    for coord in hits:
+        ai.on_result(coord, "hit", None)
+        shot.add(coord)
+    for coord in ALL_CELLS - shot - set(open_cells):
+        ai.on_result(coord, "miss", None)
+    ai.available = set(open_cells)
+    return ai
+
+
+SUNK_ALL_BUT_DESTROYER = [
+    ("Carrier", [(9, c) for c in range(5)]),
+    ("Battleship", [(8, c) for c in range(4)]),
+    ("Cruiser", [(7, c) for c in range(3)]),
+    ("Submarine", [(6, c) for c in range(3)]),
+]
+
+
+def test_solve_endgame_finishes_boxed_in_destroyer():
+    # Destroyer hit at E6 with misses above, below and to the left: E7 is the only way to sink it
+    open_cells = ALL_CELLS - {(r, c) for _, cells in SUNK_ALL_BUT_DESTROYER for r, c in cells}
+    open_cells -= {(4, 5), (3, 5), (5, 5), (4, 4)}
+    ai = endgame_ai(SUNK_ALL_BUT_DESTROYER, [(4, 5)], open_cells)
+    state = ai.endgame_state(time.perf_counter() + 5)
+    expected, bit = ai.solve_endgame(state, time.perf_counter() + 5)
+    assert game.bit_to_coord(bit) == (4, 6)
+    assert expected == 1.0
+
+
+def test_solve_endgame_picks_optimal_cell_in_l_shape():
+    # Destroyer fits A1-A2, A2-A3 or A3-B3. Firing A2 or A3 needs 1 + 2/3 * 1.5 + 1/3 * 2 = 8/3 shots
+    # on average; the end cells A1 and B3 need 3.
+    ai = endgame_ai(SUNK_ALL_BUT_DESTROYER, [], {(0, 0), (0, 1), (0, 2), (1, 2)})
+    state = ai.endgame_state(time.perf_counter() + 5)
+    assert len(state) == 3
+    expected, bit = ai.solve_endgame(state, time.perf_counter() + 5)
+    assert game.bit_to_coord(bit) in {(0, 1), (0, 2)}
+    assert abs(expected - 8 / 3) < 1e-9
+
+
+class FakeClock:
+    """Stands in for the time module in battleship; every perf_counter() call advances by step seconds."""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def perf_counter(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+
+def open_cells_without(sunk, extra=()):
+    return ALL_CELLS - {c for _, cells in sunk for c in cells} - set(extra)
+
+
+def test_endgame_state_raises_when_out_of_time(monkeypatch):
+    ai = endgame_ai(SUNK_ALL_BUT_DESTROYER, [], open_cells_without(SUNK_ALL_BUT_DESTROYER))
+    monkeypatch.setattr(game, "time", FakeClock(step=1.0))
+    with pytest.raises(game.SearchTimeout):
+        ai.endgame_state(deadline=0.5)
+
+
+def test_solve_endgame_checks_deadline_between_cells(monkeypatch):
+    ai = endgame_ai(SUNK_ALL_BUT_DESTROYER, [], {(0, 0), (0, 1), (0, 2), (1, 2)})
+    state = ai.endgame_state(deadline=float("inf"))
+    # Sub-states answer instantly with a cost high enough that no cell ends the loop early,
+    # so only the per-cell check can notice the clock: entry reads 0.0, cell one 1.0, cell two 2.0
+    solve = ai.solve_endgame
+    monkeypatch.setattr(ai, "solve_endgame", lambda st, deadline: solve(st, deadline) if st is state else (5.0, 0))
+    monkeypatch.setattr(game, "time", FakeClock(step=1.0))
+    with pytest.raises(game.SearchTimeout):
+        ai.solve_endgame(state, deadline=1.5)
+
+
+def test_next_shot_falls_back_to_target_queue_when_out_of_time(monkeypatch):
+    # Destroyer hit at E6 on an otherwise open board: the target queue holds E6's neighbours
+    ai = endgame_ai(SUNK_ALL_BUT_DESTROYER, [(4, 5)], open_cells_without(SUNK_ALL_BUT_DESTROYER, [(4, 5)]))
+    expected = ai.target_queue[-1]
+    monkeypatch.setattr(game, "time", FakeClock(step=game.ENDGAME_TIME_LIMIT * 2))
+    assert ai.endgame_shot(deadline=game.ENDGAME_TIME_LIMIT) is None
+    assert ai.next_shot() == expected
+
+
+def test_next_shot_falls_back_to_parity_when_out_of_time(monkeypatch):
+    ai = endgame_ai(SUNK_ALL_BUT_DESTROYER, [], open_cells_without(SUNK_ALL_BUT_DESTROYER))
+    assert not ai.target_queue
+    # With time to spare the endgame solver would take over
+    assert ai.endgame_state(deadline=float("inf")) is not None
+    monkeypatch.setattr(game, "time", FakeClock(step=game.ENDGAME_TIME_LIMIT * 2))
+    r, c = ai.next_shot()
+    assert (r + c) % 2 == 0
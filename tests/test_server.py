@@ -0,0 +1,171 @@
+import base64
+import os
+import pstats
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from web import server  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def decode_cells(b64, size):
+    data = base64.b64decode(b64)
+    return [[i // size, i % size] for i in range(size * size) if data[i >> 3] >> (i & 7) & 1]
+
+
+def expand_compact(board):
+    # Rebuild the serialize_board shape from the compact encoding, as app.js does
+    size = board["size"]
+    hits = decode_cells(board["hits"], size)
+    misses = decode_cells(board["misses"], size)
+    ships = []
+    for name, r, c, orient, length in board["ships"]:
+        coords = [[r, c + i] if orient == "H" else [r + i, c] for i in range(length)]
+        ship_hits = [p for p in coords if p in hits]
+        ships.append({"name": name, "size": length, "coords": coords, "hits": ship_hits, "sunk": len(ship_hits) == length})
+    return {
+        "size": size,
+        "hits": hits,
+        "misses": misses,
+        "shots": sorted(hits + misses),
+        "sunk_hit_coords": decode_cells(board["sunk_hit_coords"], size),
+        "ships": ships,
+        "all_sunk": board["all_sunk"],
+    }
+
+
+def play_mid_game(client):
+    client.post("/api/new-game", json={"auto_place": True})
+    with client.session_transaction() as sess:
+        st = server.GAMES[sess["game_id"]]
+    # Sink the AI's destroyer and take a few more shots so both boards have hits, misses and a sunk ship
+    targets = sorted(st["ai_board"].ships["Destroyer"].coords)
+    targets += [c for c in ((r, c) for r in range(server.game.BOARD_SIZE) for c in range(server.game.BOARD_SIZE)) if c not in st["ai_board"].occupied][:6]
+    for coord in targets:
+        assert client.post("/api/fire", json={"cell": server.game.coord_to_label(coord)}).status_code == 200
+    return st
+
+
+def test_encode_cells_round_trip():
+    cells = {(0, 0), (3, 7), (5, 0), (9, 9)}
+    assert decode_cells(server.encode_cells(cells), server.game.BOARD_SIZE) == sorted(list(p) for p in cells)
+
+
+@pytest.mark.parametrize("query, headers", [
+    ("?format=compact", {}),
+    ("", {"Accept": server.COMPACT_MIMETYPE}),
+])
+def test_compact_state_matches_full_state(client, query, headers):
+    play_mid_game(client)
+    full = client.get("/api/state").get_json()
+    compact = client.get("/api/state" + query, headers=headers).get_json()
+    assert compact["human"]["encoding"] == "compact"
+    assert full["ai"]["sunk_hit_coords"]
+    for side in ("human", "ai"):
+        assert expand_compact(compact[side]) == full[side]
+
+
+def test_default_format_for_wildcard_accept(client):
+    play_mid_game(client)
+    state = client.get("/api/state", headers={"Accept": "*/*"}).get_json()
+    assert "encoding" not in state["human"]
+
+
+def test_board_responses_vary_on_accept(client):
+    client.post("/api/new-game", json={"auto_place": True})
+    assert "Accept" in client.get("/api/state").headers.get("Vary", "")
+
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def admin(client, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    yield client
+    client.delete("/admin/profile", headers=ADMIN)
+
+
+def sampler_threads():
+    return [t for t in threading.enumerate() if t.name == "profile-sampler"]
+
+
+def test_admin_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", None)
+    assert client.get("/admin/profile", headers=ADMIN).status_code == 404
+
+
+def test_admin_rejects_wrong_token(admin):
+    assert admin.get("/admin/profile", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert admin.post("/admin/profile", json={}).status_code == 403
+
+
+@pytest.mark.parametrize("body", [
+    {"seconds": "nan"},
+    {"seconds": "inf"},
+    {"seconds": 0},
+    {"seconds": -5},
+    {"interval_ms": "nan"},
+    {"interval_ms": 0},
+    {"interval_ms": -1},
+    {"interval_ms": server.PROFILE_MAX_INTERVAL_MS + 1},
+])
+def test_profile_start_rejects_bad_window(admin, body):
+    assert admin.post("/admin/profile", json=body, headers=ADMIN).status_code == 400
+    assert not server.profiling_active()
+
+
+def test_profile_start_conflicts_with_active_run(admin):
+    assert admin.post("/admin/profile", json={"mode": "cprofile"}, headers=ADMIN).status_code == 200
+    assert admin.post("/admin/profile", json={"mode": "sample"}, headers=ADMIN).status_code == 409
+
+
+def test_cprofile_run_produces_loadable_pstats(admin, tmp_path):
+    assert admin.post("/admin/profile", json={"mode": "cprofile", "rate": 1}, headers=ADMIN).status_code == 200
+    admin.post("/api/new-game", json={"auto_place": True})
+    admin.post("/api/fire", json={"cell": "A1"})
+    assert admin.get("/admin/profile", headers=ADMIN).get_json()["profiled_requests"] == 2
+
+    res = admin.get("/admin/profile/pstats", headers=ADMIN)
+    assert res.status_code == 200
+    path = tmp_path / "run.pstats"
+    path.write_bytes(res.data)
+    stats = pstats.Stats(str(path))
+    assert any(name == "api_fire" for _, _, name in stats.stats)
+    assert admin.get("/admin/profile/collapsed", headers=ADMIN).status_code == 409
+
+
+def test_cprofile_window_expiry_turns_hook_off(admin):
+    admin.post("/admin/profile", json={"mode": "cprofile"}, headers=ADMIN)
+    admin.get("/api/state")
+    server.PROFILE["until"] = time.monotonic() - 1
+    admin.get("/api/state")
+    assert server.PROFILE["active"] is False
+    # Results stay available after the window closes
+    assert admin.get("/admin/profile/pstats", headers=ADMIN).status_code == 200
+
+
+def test_restarting_sample_run_replaces_sampler(admin):
+    body = {"mode": "sample", "interval_ms": server.PROFILE_MAX_INTERVAL_MS}
+    assert admin.post("/admin/profile", json=body, headers=ADMIN).status_code == 200
+    old = sampler_threads()
+    assert len(old) == 1
+    assert admin.delete("/admin/profile", headers=ADMIN).status_code == 200
+    assert server.PROFILE["active"] is False
+    assert admin.post("/admin/profile", json=body, headers=ADMIN).status_code == 200
+    old[0].join(timeout=1)
+    assert not old[0].is_alive()
+    assert len(sampler_threads()) == 1
@@ -1,7 +1,16 @@
+import base64
+import hmac
+import io
+import math
 import os
+import random
+import threading
+import time
 import uuid
+from collections import Counter
 from typing import Dict, Any
-from flask import Flask, jsonify, request, send_from_directory, session
+import flask
+from flask import Flask, g, jsonify, request, send_file, send_from_directory, session
 
 import sys
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,6 +27,25 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key")
 # In-memory store of game sessions
 GAMES: Dict[str, Dict[str, Any]] = {}
 
+# Opt-in compact board encoding: ?format=compact or this media type in Accept
+COMPACT_MIMETYPE = "application/vnd.battleship.compact+json"
+
+# Admin profiling; disabled unless ADMIN_TOKEN is set. State is per worker process.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+FLASK_DIR = os.path.dirname(os.path.abspath(flask.__file__))
+PROFILE_LOCK = threading.Lock()
+PROFILE_MAX_INTERVAL_MS = 1000.0
+PROFILE: Dict[str, Any] = {
+    "active": False,  # Cleared when a run is stopped or its window ends
+    "mode": None,  # Mode of the latest run, whose results are kept: "cprofile" or "sample"
+    "run": None,  # threading.Event of the latest run; set to stop it
+    "until": 0.0,
+    "rate": 1.0,
+    "requests": 0,
+    "stats": None,
+    "stacks": Counter(),
+}
+
 def new_game_state() -> Dict[str, Any]:
     human_board = game.Board()
     ai_board = game.Board()
@@ -72,6 +100,61 @@ def serialize_board(board: game.Board, reveal_ships: bool) -> Dict[str, Any]:
     }
 
 
+def encode_cells(cells) -> str:
+    # Bit i = r * BOARD_SIZE + c, least significant bit first within each byte
+    n = game.BOARD_SIZE * game.BOARD_SIZE
+    buf = bytearray((n + 7) // 8)
+    for r, c in cells:
+        i = r * game.BOARD_SIZE + c
+        buf[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(buf)).decode("ascii")
+
+
+def serialize_board_compact(board: game.Board, reveal_ships: bool) -> Dict[str, Any]:
+    # Carries the same information as serialize_board. The omitted fields are derived by the client:
+    # shots = hits + misses, a ship's hits = its cells that are in hits, and sunk = all its cells hit.
+    sunk_hit_coords = set()
+    ships = []
+    for s in board.ships.values():
+        if s.sunk:
+            sunk_hit_coords.update(s.hits)
+        if reveal_ships:
+            start = min(s.coords)
+            orient = "H" if all(r == start[0] for r, _ in s.coords) else "V"
+            ships.append([s.name, start[0], start[1], orient, s.size])
+    return {
+        "encoding": "compact",
+        "size": game.BOARD_SIZE,
+        "hits": encode_cells(board.hits),
+        "misses": encode_cells(board.misses),
+        "sunk_hit_coords": encode_cells(sunk_hit_coords),
+        "ships": ships,
+        "all_sunk": board.all_sunk(),
+    }
+
+
+def wants_compact() -> bool:
+    if request.args.get("format") == "compact":
+        return True
+    # JSON is listed first so wildcard Accept headers keep the default format
+    return request.accept_mimetypes.best_match(["application/json", COMPACT_MIMETYPE]) == COMPACT_MIMETYPE
+
+
+def board_payload(board: game.Board, reveal_ships: bool) -> Dict[str, Any]:
+    # The encoding depends on the Accept header, so caches must key on it
+    g.vary_accept = True
+    if wants_compact():
+        return serialize_board_compact(board, reveal_ships)
+    return serialize_board(board, reveal_ships)
+
+
+@app.after_request
+def add_vary_accept(response):
+    if g.get("vary_accept"):
+        response.vary.add("Accept")
+    return response
+
+
 @app.route("/")
 def index():
     return send_from_directory(app.template_folder, "index.html")
@@ -111,8 +194,8 @@ def api_state():
     return jsonify({
         "over": st["over"],
         "winner": st["winner"],
-        "human": serialize_board(hb, reveal_ships=True),
-        "ai": serialize_board(ab, reveal_ships=False),
+        "human": board_payload(hb, reveal_ships=True),
+        "ai": board_payload(ab, reveal_ships=False),
         "human_sunk": [name for name, s in ab.ships.items() if s.sunk],
         "ai_sunk": [name for name, s in hb.ships.items() if s.sunk],
         "placing": placing,
@@ -159,8 +242,8 @@ def api_fire():
             "state": {
                 "over": st["over"],
                 "winner": st["winner"],
-                "human": serialize_board(hb, True),
-                "ai": serialize_board(ab, False),
+                "human": board_payload(hb, True),
+                "ai": board_payload(ab, False),
             },
         })
 
@@ -180,8 +263,8 @@ def api_fire():
         "state": {
             "over": st["over"],
             "winner": st["winner"],
-            "human": serialize_board(hb, True),
-            "ai": serialize_board(ab, False),
+            "human": board_payload(hb, True),
+            "ai": board_payload(ab, False),
         },
     })
 
@@ -200,7 +283,7 @@ def api_placement_state():
         "placing": placing,
         "next_ship": next_ship,
         "placed_count": len(hb.ships),
-        "human": serialize_board(hb, reveal_ships=True),
+        "human": board_payload(hb, reveal_ships=True),
     })
 
 
@@ -231,12 +314,224 @@ def api_place():
             "ok": True,
             "done": done,
             "next_ship": (None if done else {"name": game.SHIPS[st["placing_index"]][0], "size": game.SHIPS[st["placing_index"]][1]}),
-            "human": serialize_board(hb, reveal_ships=True),
+            "human": board_payload(hb, reveal_ships=True),
         })
     else:
         return jsonify({"error": "invalid placement (out of bounds or overlap)"}), 400
 
 
+def check_admin():
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "not found"}), 404
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "forbidden"}), 403
+    return None
+
+
+def profiling_active() -> bool:
+    return PROFILE["active"] and time.monotonic() < PROFILE["until"]
+
+
+def stop_profiling(run: threading.Event) -> None:
+    # Caller holds PROFILE_LOCK; only the current run may clear the active flag
+    run.set()
+    if PROFILE["run"] is run:
+        PROFILE["active"] = False
+
+
+@app.before_request
+def profile_request_start():
+    # A single dict lookup when profiling is off
+    if not PROFILE["active"]:
+        return
+    if PROFILE["mode"] != "cprofile" or request.path.startswith("/admin/"):
+        return
+    if not profiling_active():
+        with PROFILE_LOCK:
+            stop_profiling(PROFILE["run"])
+        return
+    if random.random() >= PROFILE["rate"]:
+        return
+    import cProfile  # Profiling modules load on first use to keep startup lean
+
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        # Another request on this worker is already being profiled
+        return
+    g.profiler = (prof, PROFILE["run"])
+
+
+@app.teardown_request
+def profile_request_end(exc):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return
+    prof, run = profiler
+    prof.disable()
+    import pstats
+
+    with PROFILE_LOCK:
+        # Drop requests that started under a run that has since been replaced
+        if PROFILE["run"] is not run:
+            return
+        if PROFILE["stats"] is None:
+            PROFILE["stats"] = pstats.Stats(prof)
+        else:
+            PROFILE["stats"].add(prof)
+        PROFILE["requests"] += 1
+
+
+def frame_label(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_name}"
+
+
+def sample_stacks(run: threading.Event, until: float, interval: float, stacks: Counter) -> None:
+    me = threading.get_ident()
+    while time.monotonic() < until:
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            labels = []
+            in_app = False
+            while frame is not None:
+                filename = os.path.abspath(frame.f_code.co_filename)
+                if filename.startswith((FLASK_DIR, GAME_DIR)):
+                    in_app = True
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            # Only keep threads that are serving a request or running game code
+            if in_app:
+                key = ";".join(reversed(labels))
+                with PROFILE_LOCK:
+                    stacks[key] += 1
+        # Wakes up early when the run is stopped or replaced
+        if run.wait(interval):
+            break
+    with PROFILE_LOCK:
+        stop_profiling(run)
+
+
+@app.route("/admin/profile", methods=["GET"])
+def api_profile_status():
+    denied = check_admin()
+    if denied:
+        return denied
+    return jsonify({
+        "mode": PROFILE["mode"],
+        "active": profiling_active(),
+        "remaining": max(0.0, PROFILE["until"] - time.monotonic()),
+        "profiled_requests": PROFILE["requests"],
+        "samples": sum(PROFILE["stacks"].values()),
+        "pid": os.getpid(),
+    })
+
+
+@app.route("/admin/profile", methods=["POST"])
+def api_profile_start():
+    denied = check_admin()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    mode = data.get("mode", "sample")
+    if mode not in ("cprofile", "sample"):
+        return jsonify({"error": "mode must be 'cprofile' or 'sample'"}), 400
+    try:
+        seconds = float(data.get("seconds", 30))
+        rate = float(data.get("rate", 1.0))
+        interval_ms = float(data.get("interval_ms", 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds, rate and interval_ms must be numbers"}), 400
+    if not math.isfinite(seconds) or seconds <= 0:
+        return jsonify({"error": "seconds must be a positive number"}), 400
+    if not math.isfinite(interval_ms) or not 0 < interval_ms <= PROFILE_MAX_INTERVAL_MS:
+        return jsonify({"error": f"interval_ms must be greater than 0 and at most {PROFILE_MAX_INTERVAL_MS:g}"}), 400
+    if not math.isfinite(rate):
+        return jsonify({"error": "rate must be a number between 0 and 1"}), 400
+    seconds = min(seconds, 300.0)
+    rate = min(max(rate, 0.0), 1.0)
+    interval = max(interval_ms, 1.0) / 1000.0
+
+    # Check and reset under one lock so concurrent POSTs cannot both start a run
+    with PROFILE_LOCK:
+        if profiling_active():
+            return jsonify({"error": "profiling already running"}), 409
+        if PROFILE["run"] is not None:
+            # Stop a sampler from an expired or stopped run that has not woken up yet
+            PROFILE["run"].set()
+        run = threading.Event()
+        until = time.monotonic() + seconds
+        stacks: Counter = Counter()
+        PROFILE.update({
+            "active": True,
+            "mode": mode,
+            "run": run,
+            "until": until,
+            "rate": rate,
+            "requests": 0,
+            "stats": None,
+            "stacks": stacks,
+        })
+    if mode == "sample":
+        threading.Thread(
+            target=sample_stacks, args=(run, until, interval, stacks), name="profile-sampler", daemon=True
+        ).start()
+    return jsonify({"ok": True, "mode": mode, "seconds": seconds, "pid": os.getpid()})
+
+
+@app.route("/admin/profile", methods=["DELETE"])
+def api_profile_stop():
+    denied = check_admin()
+    if denied:
+        return denied
+    # Keep collected results for download; only stop collecting
+    with PROFILE_LOCK:
+        if PROFILE["run"] is not None:
+            stop_profiling(PROFILE["run"])
+    return jsonify({"ok": True})
+
+
+@app.route("/admin/profile/collapsed", methods=["GET"])
+def api_profile_collapsed():
+    denied = check_admin()
+    if denied:
+        return denied
+    # cProfile only records caller/callee pairs, not full stacks, so its results are served by /pstats
+    if PROFILE["mode"] != "sample":
+        return jsonify({
+            "error": "collapsed stacks are only collected with mode 'sample'; "
+                     "download cProfile results from /admin/profile/pstats",
+        }), 409
+    with PROFILE_LOCK:
+        stacks = Counter(PROFILE["stacks"])
+    body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common() if count > 0)
+    return app.response_class(body, mimetype="text/plain")
+
+
+@app.route("/admin/profile/pstats", methods=["GET"])
+def api_profile_pstats():
+    denied = check_admin()
+    if denied:
+        return denied
+    with PROFILE_LOCK:
+        stats = PROFILE["stats"]
+        if stats is None:
+            return jsonify({"error": "no cProfile data collected"}), 404
+        # Same format as pstats.Stats.dump_stats, loadable with pstats.Stats(path)
+        import marshal
+
+        data = marshal.dumps(stats.stats)
+    return send_file(
+        io.BytesIO(data),
+        mimetype="application/octet-stream",
+        as_attachment=True,
+        download_name=f"battleship-{os.getpid()}.pstats",
+    )
+
+
 @app.route("/static/<path:path>")
 def serve_static(path: str):
     return send_from_directory(app.static_folder, path)
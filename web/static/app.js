@@ -42,7 +42,39 @@ function labelCell(text) {
   return d;
 }
 
+// Compact boards send cell sets as base64 bitmasks (bit r * size + c, LSB first per byte)
+function decodeCells(b64, size) {
+  const bytes = atob(b64);
+  const out = [];
+  for (let i = 0; i < size * size; i++) {
+    if (bytes.charCodeAt(i >> 3) & (1 << (i & 7))) out.push([Math.floor(i / size), i % size]);
+  }
+  return out;
+}
+
+function decodeBoard(data) {
+  if (data.encoding !== 'compact') return data;
+  const hits = decodeCells(data.hits, data.size);
+  const misses = decodeCells(data.misses, data.size);
+  const hitKeys = new Set(hits.map((p) => `${p[0]},${p[1]}`));
+  const ships = data.ships.map(([name, r, c, orient, size]) => {
+    const coords = Array.from({ length: size }, (_, i) => (orient === 'H' ? [r, c + i] : [r + i, c]));
+    const shipHits = coords.filter((p) => hitKeys.has(`${p[0]},${p[1]}`));
+    return { name, size, coords, hits: shipHits, sunk: shipHits.length === size };
+  });
+  return {
+    size: data.size,
+    hits,
+    misses,
+    shots: hits.concat(misses),
+    sunk_hit_coords: decodeCells(data.sunk_hit_coords, data.size),
+    ships,
+    all_sunk: data.all_sunk,
+  };
+}
+
 function applyBoardState(container, data, revealShips) {
+  data = decodeBoard(data);
   const cells = container.querySelectorAll('.cell');
   const key = (r, c) => `${r},${c}`;
   const hits = new Set(data.hits.map((p) => key(p[0], p[1])));
@@ -69,7 +101,7 @@ function applyBoardState(container, data, revealShips) {
 }
 
 async function fetchState() {
-  const res = await fetch('/api/state');
+  const res = await fetch('/api/state?format=compact');
   if (!res.ok) throw new Error('Failed to fetch state');
   return await res.json();
 }
@@ -85,7 +117,7 @@ async function newGame(autoPlace, manual) {
 }
 
 async function fireAt(label) {
-  const res = await fetch('/api/fire', {
+  const res = await fetch('/api/fire?format=compact', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ cell: label }),
@@ -96,7 +128,7 @@ async function fireAt(label) {
 }
 
 async function placeShip(startLabel, orient) {
-  const res = await fetch('/api/place', {
+  const res = await fetch('/api/place?format=compact', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ start: startLabel, orient }),